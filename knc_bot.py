@@ -6,6 +6,7 @@ from ta.momentum import RSIIndicator
 from binance.client import Client
 from binance.enums import *
 from dotenv import load_dotenv
+from market_recorder import MarketRecorder
 
 # Load API keys
 load_dotenv()
@@ -18,6 +19,7 @@ symbol = "KNCUSDT"
 buy_at = 35
 sell_at = 55
 position_file = "position.txt"
+recorder = MarketRecorder("market_data").start()
 
 # --------------------------
 # Persistent Position Logic
@@ -39,6 +41,7 @@ position = load_position()
 # --------------------------
 def get_current_price():
     trades = client.get_recent_trades(symbol=symbol, limit=1)
+    recorder.record_trades(symbol, trades)
     return float(trades[0]['price'])
 
 def get_asset_balance(asset):
@@ -118,6 +121,7 @@ def fetch_rsi_and_trade():
     global position
 
     klines = client.get_klines(symbol=symbol, interval=Client.KLINE_INTERVAL_1MINUTE, limit=50)
+    recorder.record_klines(symbol, klines)
     df = pd.DataFrame(klines, columns=[
         'timestamp', 'open', 'high', 'low', 'close', 'volume',
         'close_time', 'quote_asset_volume', 'num_trades',
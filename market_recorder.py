@@ -0,0 +1,304 @@
+import os
+import csv
+import time
+import zlib
+import heapq
+import queue
+import struct
+import atexit
+import threading
+
+# --------------------------
+# Record Layout
+# --------------------------
+# Every observation is one fixed-width 64 byte little-endian record:
+#   kind (1 byte) + padding (7) | ts ms (int64) | aux (int64) | f0..f4 (5 x float64)
+#
+#   KLINE: ts = seen at, aux = open time, f0..f4 = open, high, low, close, volume
+#   TRADE: ts = seen at, aux = trade id,  f0..f4 = price, qty, quote qty, is buyer maker, trade time
+#   PRICE: ts = seen at, aux = 0,         f0     = price
+#
+# "Seen at" is the local wall clock (ms) when the bot fetched the data, so replay
+# shows exactly what the bot acted on regardless of exchange clock skew. Each poll
+# stores a new snapshot of the in-progress candle. The exchange trade time is kept
+# in f4 (ms, exact in a float64). Close time is not stored: it is open time plus
+# the kline interval minus 1 ms.
+#
+# Records are buffered per symbol and written as zlib compressed chunks, one
+# file per chunk. index.csv lists symbol, first ts, last ts, count and file for
+# every chunk so replay only has to open the chunks overlapping a time range.
+#
+# A chunk is written when it is full, when it is rotate_seconds old, or on a clean
+# exit. A bot killed with SIGKILL (or a hard crash) loses whatever is still
+# buffered, so the 60s default trades more, smaller files for a short loss window.
+KLINE = 0
+TRADE = 1
+PRICE = 2
+
+DROP_REPORT_EVERY = 1000
+
+RECORD = struct.Struct("<B7xqqddddd")
+INDEX_FILE = "index.csv"
+SEED_LOOKBACK_MS = 24 * 60 * 60 * 1000
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class MarketRecorder:
+    def __init__(self, path="market_data", chunk_records=50000, rotate_seconds=60,
+                 queue_size=10000, compress_level=6):
+        self.path = path
+        self.chunk_records = chunk_records
+        self.rotate_seconds = rotate_seconds
+        self.compress_level = compress_level
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._buffers = {}
+        self._opened_at = {}
+        self._last_kline = {}
+        self._last_trade = {}
+        self._seeded = set()
+        self._thread = None
+        self._seq = 0
+
+        os.makedirs(path, exist_ok=True)
+
+    # --------------------------
+    # Hot Path (bot thread)
+    # --------------------------
+    def record_klines(self, symbol, klines):
+        self._put((KLINE, symbol, (_now_ms(), klines)))
+
+    def record_trades(self, symbol, trades):
+        self._put((TRADE, symbol, (_now_ms(), trades)))
+
+    def record_price(self, symbol, price, ts=None):
+        self._put((PRICE, symbol, (ts if ts is not None else _now_ms(), price)))
+
+    def _put(self, item):
+        # Never block the trading loop: if the writer falls behind, count the loss.
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % DROP_REPORT_EVERY == 1:
+                print(f"RECORDER ERROR: queue full, {self.dropped} records dropped so far")
+
+    # --------------------------
+    # Writer Thread
+    # --------------------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="market-recorder", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=10):
+        if self.dropped:
+            print(f"RECORDER ERROR: {self.dropped} records dropped (queue full)")
+        thread, self._thread = self._thread, None
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            print("RECORDER ERROR: writer stuck, unflushed records lost")
+            return
+        thread.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=1)
+            except queue.Empty:
+                self._safe(self._rotate_stale)
+                continue
+            if item is None:
+                break
+            self._safe(self._pack, *item)
+            self._safe(self._rotate_stale)
+        for symbol in list(self._buffers):
+            self._safe(self._flush, symbol)
+
+    def _safe(self, fn, *args):
+        # A full disk or a vanished directory must not kill the writer thread.
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"RECORDER ERROR: {e}")
+
+    def _pack(self, kind, symbol, payload):
+        if symbol not in self._seeded:
+            self._seeded.add(symbol)
+            self._safe(self._seed, symbol)
+
+        buf = self._buffers.get(symbol)
+        if buf is None:
+            buf = self._buffers[symbol] = bytearray()
+            self._opened_at[symbol] = time.monotonic()
+
+        if kind == KLINE:
+            # Bots re-fetch the same window every loop, so only keep klines from
+            # the last seen open time onwards (the in-progress candle each time).
+            seen, klines = payload
+            last = self._last_kline.get(symbol, -1)
+            for k in klines:
+                open_time = int(k[0])
+                if open_time >= last:
+                    buf += RECORD.pack(KLINE, seen, open_time, float(k[1]), float(k[2]),
+                                       float(k[3]), float(k[4]), float(k[5]))
+                    last = open_time
+            self._last_kline[symbol] = last
+        elif kind == TRADE:
+            seen, trades = payload
+            last = self._last_trade.get(symbol, -1)
+            for t in trades:
+                if int(t['id']) <= last:
+                    continue
+                last = int(t['id'])
+                buf += RECORD.pack(TRADE, seen, int(t['id']), float(t['price']),
+                                   float(t['qty']), float(t.get('quoteQty', 0.0)),
+                                   float(t.get('isBuyerMaker', False)), float(t['time']))
+            self._last_trade[symbol] = last
+        else:
+            ts, price = payload
+            buf += RECORD.pack(PRICE, int(ts), 0, float(price), 0.0, 0.0, 0.0, 0.0)
+
+        if len(buf) >= self.chunk_records * RECORD.size:
+            self._flush(symbol)
+
+    def _seed(self, symbol):
+        # Pick up dedup state from what is already on disk, so a restarted bot does
+        # not store its whole kline window and latest trades a second time.
+        # Only the last day is read: far more than any window the bots re-fetch.
+        last_kline, last_trade = -1, -1
+        chunks = [c for c in load_index(self.path) if c[0] == symbol]
+        if chunks:
+            since = max(c[2] for c in chunks) - SEED_LOOKBACK_MS
+            for chunk in chunks:
+                if chunk[2] < since:
+                    continue
+                for r in _iter_chunk(self.path, chunk, -(1 << 63), (1 << 63) - 1):
+                    if r[0] == KLINE:
+                        last_kline = max(last_kline, r[2])
+                    elif r[0] == TRADE:
+                        last_trade = max(last_trade, r[2])
+        self._last_kline[symbol] = max(self._last_kline.get(symbol, -1), last_kline)
+        self._last_trade[symbol] = max(self._last_trade.get(symbol, -1), last_trade)
+
+    def _rotate_stale(self):
+        now = time.monotonic()
+        for symbol, opened in list(self._opened_at.items()):
+            if now - opened >= self.rotate_seconds:
+                self._flush(symbol)
+
+    def _flush(self, symbol):
+        buf = self._buffers.pop(symbol, None)
+        self._opened_at.pop(symbol, None)
+        if not buf:
+            return
+
+        # Records arrive in fetch order; sort by ts so chunk bounds are exact.
+        records = sorted(RECORD.iter_unpack(buf), key=lambda r: r[1])
+        data = b"".join(RECORD.pack(*r) for r in records)
+
+        # Several bots (or a restarted one) may share the directory, so names carry
+        # pid + wall clock and are opened exclusively: an indexed chunk is never replaced.
+        blob = zlib.compress(data, self.compress_level)
+        while True:
+            self._seq += 1
+            name = f"{symbol}-{records[0][1]}-{os.getpid()}-{_now_ms()}-{self._seq:06d}.bin.z"
+            try:
+                with open(os.path.join(self.path, name), "xb") as f:
+                    f.write(blob)
+                break
+            except FileExistsError:
+                continue
+
+        # Index row goes in last so a crash never leaves it pointing at a missing
+        # chunk; a half-written row is skipped by load_index and not appended to.
+        row = f"{symbol},{records[0][1]},{records[-1][1]},{len(records)},{name}\n".encode()
+        with open(os.path.join(self.path, INDEX_FILE), "ab+") as f:
+            # Start on a fresh line if a previous append was cut short.
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    row = b"\n" + row
+            f.write(row)
+
+
+# --------------------------
+# Replay
+# --------------------------
+def load_index(path="market_data"):
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return []
+    chunks = []
+    with open(index_path, "r", newline="") as f:
+        for row in csv.reader(f):
+            # A kill or full disk mid-append can leave a partial row; skip it.
+            try:
+                chunks.append((row[0], int(row[1]), int(row[2]), int(row[3]), row[4]))
+            except (IndexError, ValueError):
+                continue
+    return chunks
+
+
+def iter_records(path, symbol, start=None, end=None):
+    """Yield raw record tuples (kind, ts, aux, f0, f1, f2, f3, f4) for symbol with
+    start <= ts <= end, in time order. Chunks fully inside the range are yielded
+    straight from struct.iter_unpack without per-record filtering."""
+    lo = start if start is not None else -(1 << 63)
+    hi = end if end is not None else (1 << 63) - 1
+    chunks = sorted((c for c in load_index(path) if c[0] == symbol and c[2] >= lo and c[1] <= hi),
+                    key=lambda c: c[1])
+
+    # Chunks are internally sorted but can still overlap: two bots recording the
+    # same symbol into one directory interleave in time, record_price accepts an
+    # explicit ts, and the wall clock can step backwards. Merge overlapping runs,
+    # stream the rest.
+    group, group_end = [], None
+    for chunk in chunks:
+        if group and chunk[1] > group_end:
+            yield from _iter_group(path, group, lo, hi)
+            group = []
+        group.append(chunk)
+        group_end = chunk[2] if len(group) == 1 else max(group_end, chunk[2])
+    if group:
+        yield from _iter_group(path, group, lo, hi)
+
+
+def _iter_chunk(path, chunk, lo, hi):
+    _, first, last, _, name = chunk
+    with open(os.path.join(path, name), "rb") as f:
+        data = zlib.decompress(f.read())
+    if lo <= first and last <= hi:
+        return RECORD.iter_unpack(data)
+    return (r for r in RECORD.iter_unpack(data) if lo <= r[1] <= hi)
+
+
+def _iter_group(path, group, lo, hi):
+    if len(group) == 1:
+        return _iter_chunk(path, group[0], lo, hi)
+    return heapq.merge(*(_iter_chunk(path, c, lo, hi) for c in group), key=lambda r: r[1])
+
+
+def replay(path="market_data", symbols=None, start=None, end=None):
+    """Yield (symbol, record) across symbols merged by timestamp."""
+    if symbols is None:
+        symbols = sorted({c[0] for c in load_index(path)})
+    elif isinstance(symbols, str):
+        symbols = [symbols]
+
+    streams = [_tagged(s, iter_records(path, s, start, end)) for s in symbols]
+    return heapq.merge(*streams, key=lambda item: item[1][1])
+
+
+def _tagged(symbol, records):
+    for r in records:
+        yield symbol, r
@@ -7,6 +7,7 @@ from ta.momentum import RSIIndicator
 from dotenv import load_dotenv
 from binance.client import Client
 from binance.enums import *
+from market_recorder import MarketRecorder
 
 # Load .env
 load_dotenv()
@@ -21,10 +22,12 @@ symbol = "IOTXUSDT"
 interval = Client.KLINE_INTERVAL_1MINUTE
 paper_mode = True  # Set False to trade real
 position = None  # Track holding state
+recorder = MarketRecorder("market_data")
 
 # ===== Utility Functions =====
 def get_klines():
     klines = client.get_klines(symbol=symbol, interval=interval, limit=100)
+    recorder.record_klines(symbol, klines)
     df = pd.DataFrame(klines, columns=[
         'timestamp', 'open', 'high', 'low', 'close', 'volume',
         'close_time', 'quote_asset_volume', 'num_trades',
@@ -35,6 +38,7 @@ def get_klines():
 
 def get_current_price():
     ticker = client.get_symbol_ticker(symbol=symbol)
+    recorder.record_price(symbol, ticker["price"])
     return float(ticker["price"])
 
 def get_usdt_balance():
@@ -107,6 +111,7 @@ def place_market_sell(qty):
 def run_bot():
     global position
     print("▶️ Starting RSI + EMA + Support Bot...")
+    recorder.start()
 
     # Optional manual support zone
     support_level = 0.025
@@ -0,0 +1,131 @@
+import os
+import time
+import shutil
+
+from market_recorder import MarketRecorder, iter_records, load_index, replay, KLINE, TRADE, PRICE
+
+T0 = 1_700_000_000_000
+
+
+def make_klines(n, start=0):
+    return [[T0 + i * 60000, "1.0", "1.2", "0.9", f"{1 + i / 1000:.3f}", "500.0",
+             T0 + i * 60000 + 59999, "0", 10, "0", "0", "0"] for i in range(start, start + n)]
+
+
+def make_trade(i):
+    return {"id": i, "price": "1.5", "qty": "2.0", "quoteQty": "3.0", "time": T0 + i, "isBuyerMaker": True}
+
+
+def record(path, fn, **kwargs):
+    recorder = MarketRecorder(str(path), **kwargs).start()
+    fn(recorder)
+    recorder.stop()
+    return recorder
+
+
+def test_round_trip(tmp_path):
+    def fill(r):
+        r.record_klines("X", make_klines(3))
+        r.record_trades("X", [make_trade(1), make_trade(2)])
+        r.record_price("X", 1.25, ts=T0 + 5)
+    record(tmp_path, fill)
+
+    records = list(iter_records(str(tmp_path), "X"))
+    assert [r[0] for r in records] == [PRICE, KLINE, KLINE, KLINE, TRADE, TRADE]
+    assert records[0][1] == T0 + 5 and records[0][3] == 1.25
+    assert [r[2] for r in records if r[0] == KLINE] == [T0, T0 + 60000, T0 + 120000]
+    assert records[3][3:8] == (1.0, 1.2, 0.9, 1.002, 500.0)
+    assert records[4][2:8] == (1, 1.5, 2.0, 3.0, 1.0, T0 + 1)
+    # Klines and trades are stamped with the local time they were fetched.
+    assert T0 < records[1][1] <= records[4][1]
+
+
+def test_range_edges_are_inclusive(tmp_path):
+    def fill(r):
+        for i in range(100):
+            r.record_price("X", i, ts=T0 + i)
+    record(tmp_path, fill, chunk_records=30)
+
+    assert len(load_index(str(tmp_path))) == 4
+    got = [r[1] - T0 for r in iter_records(str(tmp_path), "X", T0 + 29, T0 + 60)]
+    assert got == list(range(29, 61))
+    assert list(iter_records(str(tmp_path), "X", T0 + 100)) == []
+
+
+def test_overlapping_chunks_replay_in_order(tmp_path):
+    def fill(r):
+        for ts in (10, 30, 50, 20, 40, 60):
+            r.record_price("X", ts, ts=T0 + ts)
+        r.record_price("Y", 0, ts=T0 + 35)
+    record(tmp_path, fill, chunk_records=3)
+
+    assert [r[1] - T0 for r in iter_records(str(tmp_path), "X")] == [10, 20, 30, 40, 50, 60]
+    assert [r[1] - T0 for r in iter_records(str(tmp_path), "X", T0 + 25, T0 + 45)] == [30, 40]
+    assert [(s, r[1] - T0) for s, r in replay(str(tmp_path))][3:5] == [("Y", 35), ("X", 40)]
+
+
+def test_restart_keeps_old_chunks_and_skips_duplicates(tmp_path):
+    def fill(n):
+        def run(r):
+            r.record_klines("X", make_klines(n))
+            r.record_trades("X", [make_trade(7)])
+        return run
+    record(tmp_path, fill(50))
+    record(tmp_path, fill(51))
+
+    index = load_index(str(tmp_path))
+    assert len({c[4] for c in index}) == len(index) == 2
+    records = list(iter_records(str(tmp_path), "X"))
+    assert sum(r[0] == TRADE for r in records) == 1
+    # Second run only re-records the last candle from before plus the new one.
+    assert [r[2] for r in records if r[0] == KLINE][-3:] == [T0 + 49 * 60000, T0 + 49 * 60000, T0 + 50 * 60000]
+    assert sum(r[0] == KLINE for r in records) == 52
+
+
+def test_partial_index_row_is_skipped(tmp_path):
+    record(tmp_path, lambda r: r.record_klines("X", make_klines(5)))
+    with open(tmp_path / "index.csv", "a") as f:
+        f.write("X,17000")
+
+    assert len(list(iter_records(str(tmp_path), "X"))) == 5
+    record(tmp_path, lambda r: r.record_klines("X", make_klines(5)))
+    assert len(list(iter_records(str(tmp_path), "X"))) == 6
+
+
+def test_dropped_records_are_reported(tmp_path, capsys):
+    recorder = MarketRecorder(str(tmp_path), queue_size=1)
+    for i in range(1003):
+        recorder.record_price("X", i, ts=T0 + i)
+    recorder.stop()
+
+    assert recorder.dropped == 1002
+    assert capsys.readouterr().out.splitlines() == [
+        "RECORDER ERROR: queue full, 1 records dropped so far",
+        "RECORDER ERROR: queue full, 1001 records dropped so far",
+        "RECORDER ERROR: 1002 records dropped (queue full)",
+    ]
+
+
+def wait_until_drained(recorder):
+    deadline = time.monotonic() + 5
+    while not recorder._queue.empty() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+
+def test_writer_survives_missing_directory(tmp_path):
+    path = tmp_path / "gone"
+    recorder = MarketRecorder(str(path), rotate_seconds=0, queue_size=5).start()
+    thread = recorder._thread
+    shutil.rmtree(path)
+    for i in range(5):
+        recorder.record_price("X", i, ts=T0 + i)
+    wait_until_drained(recorder)
+    assert thread.is_alive()
+
+    os.makedirs(path)
+    for i in range(5, 8):
+        recorder.record_price("X", i, ts=T0 + i)
+    recorder.stop(timeout=5)
+
+    assert [r[1] - T0 for r in iter_records(str(path), "X")] == [5, 6, 7]